@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+orjson-backed response model for the Google Calendar API client
+Shared by main.py and the test scripts; imports nothing beyond orjson and googleapiclient
+"""
+
+import orjson
+from googleapiclient.model import JsonModel
+
+class OrjsonModel(JsonModel):
+    """JsonModel that parses Calendar responses with orjson"""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return content
+        if self._data_wrapper and 'data' in body:
+            body = body['data']
+        return body
@@ -8,21 +8,36 @@ import os
 import json
 import asyncio
 import logging
-import time
+import random
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, TypedDict
+from functools import partial
+from typing import Dict, Any, Optional, Union
 from dataclasses import dataclass
 
 # Core dependencies
-import requests
+import aiohttp
+import httplib2
+import orjson
+from cachetools import LRUCache, TTLCache
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception, stop_after_attempt, wait_random_exponential
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
+# Optional faster event loop (not available on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Langchain imports
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic.json_schema import SkipJsonSchema
 
 # LangGraph imports
 from langgraph.graph import StateGraph, END
@@ -31,8 +46,11 @@ from langgraph.graph.message import add_messages
 # Google Calendar API
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from calendar_model import OrjsonModel
 
 # Environment variables
 from dotenv import load_dotenv
@@ -48,12 +66,30 @@ logger = logging.getLogger(__name__)
 
 class IntentExtraction(BaseModel):
     """Structured output for intent extraction from user message"""
+    # Re-validate on assignment so parsed_dt follows corrections to datetime_str
+    model_config = ConfigDict(validate_assignment=True)
+    
     activity: str = Field(description="The activity the user wants to do")
     datetime_str: str = Field(description="Extracted date and time in ISO format")
     location: Optional[str] = Field(description="Location if mentioned", default=None)
     confidence: float = Field(description="Confidence score 0-1", default=0.0)
     is_weather_query: bool = Field(description="True if this is just a weather query, not scheduling", default=False)
     has_specific_time: bool = Field(description="True if user provided specific time, False if only date or vague", default=False)
+    # Parsed once from datetime_str; hidden from the LLM schema and from serialization
+    parsed_dt: SkipJsonSchema[Optional[datetime]] = Field(default=None, exclude=True)
+    
+    @model_validator(mode='after')
+    def _parse_datetime(self) -> 'IntentExtraction':
+        """Parse datetime_str so downstream nodes can use the datetime directly"""
+        try:
+            # Python 3.11+ accepts a trailing 'Z'
+            parsed_dt = datetime.fromisoformat(self.datetime_str)
+        except ValueError:
+            # Non-scheduling intents may carry a placeholder instead of a datetime
+            parsed_dt = None
+        # Bypass validate_assignment, which would re-run this validator
+        object.__setattr__(self, 'parsed_dt', parsed_dt)
+        return self
 
 class WeatherData(BaseModel):
     """Weather information structure"""
@@ -62,27 +98,31 @@ class WeatherData(BaseModel):
     is_rainy: bool
     humidity: int
     feels_like: Optional[float] = None
+    # Set on the placeholder returned when the upstream lookup failed
+    is_fallback: bool = False
 
-@dataclass
-class AgentState(TypedDict):
+@dataclass(slots=True)
+class AgentState:
     """State object for LangGraph agent"""
     user_message: str
     telegram_chat_id: int
-    intent: Optional[IntentExtraction]
-    weather: Optional[WeatherData]
-    calendar_event_created: bool
-    response_message: str
-    needs_clarification: bool
+    intent: Optional[IntentExtraction] = None
+    weather: Optional[WeatherData] = None
+    calendar_event_created: bool = False
+    response_message: str = ""
+    needs_clarification: bool = False
+    # Set when the intent was already extracted before the workflow runs
+    skip_intent_extraction: bool = False
 
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
 
-def format_datetime_human_readable(datetime_str: str) -> str:
-    """Convert ISO datetime string to human-readable format"""
+def format_datetime_human_readable(dt: Union[datetime, str]) -> str:
+    """Convert a datetime (or ISO datetime string) to human-readable format"""
     try:
-        from datetime import datetime
-        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
+        if isinstance(dt, str):
+            dt = datetime.fromisoformat(dt)
         
         # Format: "28 May 2025, 3:00 PM" or "28 May 2025" if time is midnight
         if dt.hour == 0 and dt.minute == 0:
@@ -90,179 +130,431 @@ def format_datetime_human_readable(datetime_str: str) -> str:
         else:
             return dt.strftime("%d %B %Y, %I:%M %p").replace(" 0", " ")  # Remove leading zero from hour
     except Exception as e:
-        logger.error(f"Error formatting datetime: {e}")
-        return datetime_str
+        logger.error("Error formatting datetime: %s", e)
+        return str(dt)
+
+def parse_weather_choice(message: str) -> Optional[str]:
+    """Return the option a reply to the rainy-weather question picks, or None if unclear"""
+    # The first recognised word decides, so "no, don't proceed" cancels
+    matches = [(match.start(), choice) for pattern, choice in _WX_CHOICES if (match := pattern.search(message))]
+    return min(matches)[1] if matches else None
+
+# =============================================================================
+# PROMPTS
+# =============================================================================
+
+INTENT_SYSTEM_PROMPT = """You are an AI assistant that extracts scheduling intent from natural language.
+
+ONLY extract scheduling information if the user is clearly trying to schedule an activity or event.
+
+IMPORTANT RULES:
+1. **NON-SCHEDULING MESSAGES**: If the user is just greeting (hello, hi, hey), asking general questions, 
+   or having casual conversation WITHOUT mentioning scheduling/planning activities, set:
+   - activity="casual conversation"
+   - confidence=0.0 (very low confidence)
+   
+2. **WEATHER QUERIES**: If asking about weather without scheduling (e.g., "what's the weather like", "how's the weather"), set:
+   - is_weather_query=true
+   - activity="weather query"
+   
+3. **SCHEDULING REQUESTS**: Only if the user mentions wanting to DO something at a specific time/date:
+   - "I want to go for a run tomorrow at 3pm"
+   - "Schedule a meeting this Friday"
+   - "Plan a picnic next Saturday"
+   - Set confidence=0.8+ for clear scheduling intent
+   
+4. **TIME SPECIFICITY**:
+   - has_specific_time=true ONLY if user provides specific time (e.g., "3pm", "at 2:30", "9 in the morning")
+   - has_specific_time=false if only date or vague time (e.g., "tomorrow", "this Saturday", "next week")
+   
+5. **LOCATION**: Default to "Singapore" if no location specified
+
+Examples:
+- "hello" → activity="casual conversation", confidence=0.0
+- "how are you?" → activity="casual conversation", confidence=0.0  
+- "what's the weather?" → activity="weather query", is_weather_query=true
+- "I want to run tomorrow at 3pm" → activity="run", confidence=0.9, has_specific_time=true
+
+{format_instructions}
+"""
+
+# Gemini may wrap its JSON answer in a markdown code fence
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Times measured from the current clock ("in 2 hours", "now"), which must never be served from cache
+_CLOCK_RELATIVE_RE = re.compile(r"\b(?:now|in (?:an?|\d+|half an) (?:min|minute|hour|hr)s?)\b", re.IGNORECASE)
+
+# =============================================================================
+# KEYWORDS
+# =============================================================================
+
+_RAIN_RE = re.compile(r"rain|drizzle|shower", re.IGNORECASE)
+
+# Casual conversation categories, matched on whole words against the lowercased message
+_GREETING_RE = re.compile(r"\b(?:hello|hi|hey|good (?:morning|afternoon|evening))\b")
+_SMALL_TALK_RE = re.compile(r"\b(?:how are you|what's up|how's it going)\b")
+_THANKS_RE = re.compile(r"\b(?:thank|appreciate)")
+
+# Activity words that decide whether the weather matters; outdoor words win when both appear
+_INDOOR = frozenset({"meeting", "call", "zoom", "study", "dentist", "doctor", "appointment", "interview", "class", "lecture"})
+_OUTDOOR = frozenset({"run", "jog", "hike", "picnic", "bike", "cycle", "walk", "tennis", "soccer", "football", "beach"})
+
+# Words that mark a message as a new scheduling request rather than a clarification reply
+_SCHED_KW = frozenset({"want", "schedule", "plan", "book", "at", "tomorrow", "today", "this", "next"})
+
+# Replies to the rainy-weather question, one pattern per option; the earliest match decides
+_WX_PROCEED = re.compile(r"\b(?:1|proceed|yes|continue|anyway)\b", re.IGNORECASE)
+_WX_RESCHED = re.compile(r"\b(?:2|reschedule|different|later|change)\b", re.IGNORECASE)
+_WX_CANCEL = re.compile(r"\b(?:3|cancel|no|don'?t|skip)\b", re.IGNORECASE)
+_WX_CHOICES = ((_WX_PROCEED, "proceed"), (_WX_RESCHED, "reschedule"), (_WX_CANCEL, "cancel"))
+
+# Relative names for dates a given number of days from today
+_RELATIVE_DAYS = {0: "today", 1: "tomorrow", -1: "yesterday"}
+
+# =============================================================================
+# RESPONSES
+# =============================================================================
+
+GREETING_RESPONSE = "Hello! 👋 I'm your AI scheduling assistant. I can help you:\n\n📅 **Schedule activities** - Just tell me what you want to do and when!\n🌤️ **Check weather** - Ask about weather for any location\n\n**Examples:**\n• 'I want to go for a run tomorrow at 3pm'\n• 'Schedule a meeting this Friday at 2pm'\n• 'What's the weather like tomorrow?'\n\nHow can I help you today?"
+SMALL_TALK_RESPONSE = "I'm doing great, thank you! 😊 I'm here and ready to help you schedule activities and check the weather. What would you like to plan today?"
+THANKS_RESPONSE = "You're very welcome! 😊 Feel free to ask me anytime if you need help scheduling activities or checking the weather!"
+CASUAL_DEFAULT_RESPONSE = "I'm your AI scheduling assistant! 🤖 I can help you schedule activities and check weather forecasts.\n\n**Try asking me:**\n• 'Schedule a workout tomorrow at 6pm'\n• 'What's the weather like this weekend?'\n• 'I want to have a picnic on Saturday'\n\nWhat would you like to plan?"
+UNCLEAR_INTENT_RESPONSE = "I'm not sure I understood what you'd like to do. Could you please be more specific?\n\n📅 **For scheduling:**\n• 'I want to go for a run at 4pm this Saturday'\n• 'Schedule a picnic tomorrow at 2pm'\n• 'Plan a bike ride next Tuesday morning'\n\n🌤️ **For weather queries:**\n• 'What's the weather like tomorrow?'\n• 'How's the weather this Saturday 3pm?'"
+
+# Templates, filled with str.format
+CLARIFY_TIME_TPL = "⏰ I see you want to {activity} on {date}, but what time would you prefer?\n\nFor example:\n• '3pm'\n• '2:30 in the afternoon'\n• '9 in the morning'\n• 'around lunchtime'"
+RAINY_WEATHER_TPL = "🌧️ The weather forecast shows {weather} for your planned {activity} on {date}. Would you like to:\n\n1. Proceed anyway\n2. Reschedule to a different time\n3. Cancel the activity\n\nPlease let me know what you'd prefer!"
+
+# Casual conversation responses, checked in order
+_CASUAL_RESPONSES = (
+    (_GREETING_RE, GREETING_RESPONSE),
+    (_SMALL_TALK_RE, SMALL_TALK_RESPONSE),
+    (_THANKS_RE, THANKS_RESPONSE),
+)
+
+# =============================================================================
+# HTTP SESSION AND RETRIES
+# =============================================================================
+
+# Upstream status codes worth retrying (rate limits and transient server errors)
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+_backoff = wait_random_exponential(min=0.2, max=4)
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Check if an upstream error is a rate limit or transient server error"""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in RETRYABLE_STATUS
+    if isinstance(exc, HttpError):
+        return exc.resp.status in RETRYABLE_STATUS
+    return False
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Wait for Retry-After when the upstream sends it, else back off exponentially with jitter"""
+    exc = retry_state.outcome.exception()
+    # aiohttp exposes response headers directly; httplib2 responses are lowercased header dicts
+    headers = exc.headers if isinstance(exc, aiohttp.ClientResponseError) else getattr(exc, "resp", None)
+    retry_after = headers.get("retry-after") if headers else None
+    if retry_after:
+        try:
+            # Cap it so a long server-side cooldown doesn't hold the user's turn hostage
+            return min(float(retry_after), 10.0)
+        except ValueError:
+            pass  # HTTP-date form, fall back to backoff
+    return _backoff(retry_state)
+
+def upstream_retrying() -> AsyncRetrying:
+    """Retry policy for calls to rate-limited upstream APIs"""
+    return AsyncRetrying(
+        wait=_retry_wait,
+        stop=stop_after_attempt(4),
+        retry=retry_if_exception(_is_retryable),
+        reraise=True
+    )
+
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        # One pooled session for the whole process so concurrent users share sockets and DNS;
+        # idle TLS connections are kept for a minute since bot traffic arrives in bursts
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=5)
+        )
+    return _http_session
+
+async def close_http_session():
+    """Close the shared aiohttp session (called on shutdown)"""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
 
 # =============================================================================
 # API CLIENTS
 # =============================================================================
 
+class IntentCache:
+    """Cache of extracted intents keyed on the normalized message text"""
+    
+    def __init__(self, max_entries: int = 512):
+        self._day = None
+        self._entries = LRUCache(maxsize=max_entries)
+    
+    @staticmethod
+    def key(text: str) -> Optional[str]:
+        """Return the cache key for a message, or None if its meaning depends on the current time"""
+        if _CLOCK_RELATIVE_RE.search(text):
+            return None
+        return " ".join(text.lower().split())
+    
+    def _roll_day(self):
+        # Relative dates ("today", "tomorrow") resolve differently each day,
+        # so entries are only valid for the date they were extracted on
+        today = datetime.now().date()
+        if today != self._day:
+            self._day = today
+            self._entries.clear()
+    
+    def lookup(self, key: str) -> Optional[IntentExtraction]:
+        """Return the cached intent for a message key, if any"""
+        self._roll_day()
+        entry = self._entries.get(key)
+        return IntentExtraction.model_validate_json(entry) if entry else None
+    
+    def add(self, key: str, intent: IntentExtraction):
+        """Store an extracted intent under its message key"""
+        self._roll_day()
+        self._entries[key] = intent.model_dump_json()
+
 class GeminiClient:
     """Client for Gemini API using Langchain"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, intent_cache: bool = True):
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-2.0-flash-exp",
             google_api_key=api_key,
-            temperature=0.1
+            temperature=0.1,
+            # The model already retries rate limits and server errors with backoff
+            max_retries=3
         )
         self.parser = PydanticOutputParser(pydantic_object=IntentExtraction)
+        # The format instructions only depend on the schema, so build the system message once
+        self._format_instructions = self.parser.get_format_instructions()
+        self._system_message = SystemMessage(content=INTENT_SYSTEM_PROMPT.format(
+            format_instructions=self._format_instructions
+        ))
+        self.cache = IntentCache() if intent_cache else None
     
     async def extract_intent(self, user_message: str) -> IntentExtraction:
         """Extract intent and datetime from user message"""
-        system_prompt = """You are an AI assistant that extracts scheduling intent from natural language.
-        
-        ONLY extract scheduling information if the user is clearly trying to schedule an activity or event.
-        
-        Current date/time for reference: {current_time}
-        
-        IMPORTANT RULES:
-        1. **NON-SCHEDULING MESSAGES**: If the user is just greeting (hello, hi, hey), asking general questions, 
-           or having casual conversation WITHOUT mentioning scheduling/planning activities, set:
-           - activity="casual conversation"
-           - confidence=0.0 (very low confidence)
-           
-        2. **WEATHER QUERIES**: If asking about weather without scheduling (e.g., "what's the weather like", "how's the weather"), set:
-           - is_weather_query=true
-           - activity="weather query"
-           
-        3. **SCHEDULING REQUESTS**: Only if the user mentions wanting to DO something at a specific time/date:
-           - "I want to go for a run tomorrow at 3pm"
-           - "Schedule a meeting this Friday"
-           - "Plan a picnic next Saturday"
-           - Set confidence=0.8+ for clear scheduling intent
-           
-        4. **TIME SPECIFICITY**:
-           - has_specific_time=true ONLY if user provides specific time (e.g., "3pm", "at 2:30", "9 in the morning")
-           - has_specific_time=false if only date or vague time (e.g., "tomorrow", "this Saturday", "next week")
-           
-        5. **LOCATION**: Default to "Singapore" if no location specified
-        
-        Examples:
-        - "hello" → activity="casual conversation", confidence=0.0
-        - "how are you?" → activity="casual conversation", confidence=0.0  
-        - "what's the weather?" → activity="weather query", is_weather_query=true
-        - "I want to run tomorrow at 3pm" → activity="run", confidence=0.9, has_specific_time=true
-        
-        {format_instructions}
-        """
+        # Repeated messages reuse a previous extraction instead of calling the LLM
+        key = self.cache.key(user_message) if self.cache else None
+        if key is not None:
+            cached_intent = self.cache.lookup(key)
+            if cached_intent:
+                logger.info("Intent cache hit")
+                return cached_intent
         
+        # The system prompt stays byte-identical across calls so Gemini can reuse
+        # the cached prefix; only the user turn carries the current time
         messages = [
-            SystemMessage(content=system_prompt.format(
-                current_time=datetime.now().isoformat(),
-                format_instructions=self.parser.get_format_instructions()
-            )),
-            HumanMessage(content=user_message)
+            self._system_message,
+            HumanMessage(content=f"Current date/time for reference: {datetime.now().isoformat()}\n\n{user_message}")
         ]
         
         try:
-            response = await self.llm.ainvoke(messages)
-            return self.parser.parse(response.content)
+            # Cap a hung Gemini call; a timeout falls through to the low-confidence fallback
+            async with asyncio.timeout(6):
+                response = await self.llm.ainvoke(messages)
+            # Validate the raw JSON in pydantic-core instead of json.loads + model_validate
+            match = _JSON_OBJECT_RE.search(response.content)
+            if not match:
+                raise ValueError(f"No JSON object in response: {response.content}")
+            intent = IntentExtraction.model_validate_json(match.group())
         except Exception as e:
-            logger.error(f"Error extracting intent: {e}")
+            logger.error("Error extracting intent: %s", e)
             return IntentExtraction(
                 activity="unknown",
                 datetime_str=datetime.now().isoformat(),
                 confidence=0.0
             )
+        
+        if key is not None:
+            self.cache.add(key, intent)
+        return intent
 
 class WeatherClient:
     """Client for OpenWeatherMap API"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, session: Optional[aiohttp.ClientSession] = None):
         self.api_key = api_key
         self.base_url = "http://api.openweathermap.org/data/2.5"
+        # Injected session, falls back to the shared module-level session
+        self._session = session
+        # Parsed WeatherData keyed by (location, target hour)
+        self._cache = TTLCache(maxsize=1024, ttl=600)
+        # One lock per key while any lookup holds or waits on it, with the number of such lookups
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+        self._lock_users: Dict[tuple, int] = {}
+        # Raw /forecast payloads keyed by location; one payload covers every slot for 5 days
+        self._forecast_cache = TTLCache(maxsize=256, ttl=600)
+        self._forecast_tasks: Dict[str, asyncio.Task] = {}
+    
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self._session or get_http_session()
+    
+    async def _get_json(self, endpoint: str, location: str) -> Dict[str, Any]:
+        """Call an OpenWeatherMap endpoint for a location and return the decoded JSON"""
+        params = {
+            "q": location,
+            "appid": self.api_key,
+            "units": "metric"
+        }
+        
+        async for attempt in upstream_retrying():
+            with attempt:
+                async with asyncio.timeout(3):
+                    async with self.session.get(f"{self.base_url}/{endpoint}", params=params) as response:
+                        response.raise_for_status()
+                        return orjson.loads(await response.read())
+    
+    def prefetch_forecast(self, location: str = "Singapore"):
+        """Start fetching a location's forecast in the background for a later lookup to reuse"""
+        if location.lower() not in self._forecast_cache:
+            self._forecast_task(location)
     
-    async def get_weather_forecast(self, datetime_str: str, location: str = "Singapore") -> WeatherData:
+    def _forecast_task(self, location: str) -> asyncio.Task:
+        """Return the in-flight forecast fetch for a location, starting one if needed"""
+        key = location.lower()
+        task = self._forecast_tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._get_json("forecast", location))
+            task.add_done_callback(partial(self._finish_forecast, key))
+            self._forecast_tasks[key] = task
+        return task
+    
+    def _finish_forecast(self, key: str, task: asyncio.Task):
+        self._forecast_tasks.pop(key, None)
+        # Retrieving the exception also keeps unawaited prefetch failures from being reported
+        if not task.cancelled() and task.exception() is None:
+            self._forecast_cache[key] = task.result()
+    
+    async def _get_forecast(self, location: str) -> Dict[str, Any]:
+        """Return the 5-day forecast for a location, reusing a cached or in-flight fetch"""
+        key = location.lower()
+        if key in self._forecast_cache:
+            logger.info("Reusing cached forecast for %s", location)
+            return self._forecast_cache[key]
+        # Shield so a cancelled caller does not cancel a fetch other callers share
+        return await asyncio.shield(self._forecast_task(location))
+    
+    async def get_weather_forecast(self, target_dt: datetime, location: str = "Singapore") -> WeatherData:
         """Get weather forecast for specific datetime and location"""
         try:
-            from datetime import datetime
-            
-            # Parse the target datetime
-            target_dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-            current_dt = datetime.now()
-            
-            # If the target time is more than 5 days away, use current weather as fallback
-            # Otherwise, try to use the 5-day forecast endpoint
-            if (target_dt - current_dt).days <= 5:
-                # Use 5-day forecast endpoint for better accuracy
-                url = f"{self.base_url}/forecast"
-                params = {
-                    "q": location,
-                    "appid": self.api_key,
-                    "units": "metric"
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Find the closest forecast to the target time
-                closest_forecast = None
-                min_time_diff = float('inf')
-                
-                for forecast in data["list"]:
-                    forecast_dt = datetime.fromtimestamp(forecast["dt"])
-                    time_diff = abs((forecast_dt - target_dt).total_seconds())
-                    
-                    if time_diff < min_time_diff:
-                        min_time_diff = time_diff
-                        closest_forecast = forecast
-                
-                if closest_forecast:
-                    weather_desc = closest_forecast["weather"][0]["description"].lower()
-                    is_rainy = any(word in weather_desc for word in ["rain", "drizzle", "shower"])
-                    
-                    return WeatherData(
-                        temperature=closest_forecast["main"]["temp"],
-                        description=closest_forecast["weather"][0]["description"],
-                        is_rainy=is_rainy,
-                        humidity=closest_forecast["main"]["humidity"],
-                        feels_like=closest_forecast["main"].get("feels_like")
-                    )
+            # Forecasts only update every 3 hours, so one lookup per location and hour is enough
+            key = (location.lower(), target_dt.strftime('%Y%m%d%H'))
+            if key in self._cache:
+                return self._cache[key]
             
-            # Fallback to current weather if forecast is not available or too far in future
-            url = f"{self.base_url}/weather"
-            params = {
-                "q": location,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            weather_desc = data["weather"][0]["description"].lower()
-            is_rainy = any(word in weather_desc for word in ["rain", "drizzle", "shower"])
-            
-            return WeatherData(
-                temperature=data["main"]["temp"],
-                description=data["weather"][0]["description"],
-                is_rainy=is_rainy,
-                humidity=data["main"]["humidity"],
-                feels_like=data["main"].get("feels_like")
-            )
+            # Concurrent lookups for the same key wait for a single upstream fetch
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = asyncio.Lock()
+            self._lock_users[key] = self._lock_users.get(key, 0) + 1
+            try:
+                async with lock:
+                    if key in self._cache:
+                        return self._cache[key]
+                    weather = await self._fetch_weather(target_dt, location)
+                    self._cache[key] = weather
+                    return weather
+            finally:
+                # Drop the lock once the last holder or waiter leaves, even when the fetch failed
+                self._lock_users[key] -= 1
+                if not self._lock_users[key]:
+                    del self._lock_users[key]
+                    del self._locks[key]
             
         except Exception as e:
-            logger.error(f"Error fetching weather: {e}")
+            logger.error("Error fetching weather: %s", e)
             # Return default non-rainy weather to avoid blocking
             return WeatherData(
                 temperature=25.0,  # More realistic for Singapore
                 description="clear sky",
                 is_rainy=False,
                 humidity=70,  # More realistic for Singapore
-                feels_like=27.0
+                feels_like=27.0,
+                is_fallback=True
             )
+    
+    async def _fetch_weather(self, target_dt: datetime, location: str) -> WeatherData:
+        """Fetch weather for a datetime and location from OpenWeatherMap"""
+        current_dt = datetime.now()
+        
+        # If the target time is more than 5 days away, use current weather as fallback
+        # Otherwise, try to use the 5-day forecast endpoint
+        if (target_dt - current_dt).days <= 5:
+            # Use 5-day forecast endpoint for better accuracy
+            data = await self._get_forecast(location)
+            
+            # Entries sit on a fixed 3-hour grid, so the closest one can be indexed directly
+            entries = data["list"]
+            if entries:
+                index = round((target_dt.timestamp() - entries[0]["dt"]) / 10800)
+                closest_forecast = entries[max(0, min(len(entries) - 1, index))]
+                
+                weather_desc = closest_forecast["weather"][0]["description"]
+                
+                return WeatherData(
+                    temperature=closest_forecast["main"]["temp"],
+                    description=weather_desc,
+                    is_rainy=_RAIN_RE.search(weather_desc) is not None,
+                    humidity=closest_forecast["main"]["humidity"],
+                    feels_like=closest_forecast["main"].get("feels_like")
+                )
+        
+        # Fallback to current weather if forecast is not available or too far in future
+        data = await self._get_json("weather", location)
+        
+        weather_desc = data["weather"][0]["description"]
+        
+        return WeatherData(
+            temperature=data["main"]["temp"],
+            description=weather_desc,
+            is_rainy=_RAIN_RE.search(weather_desc) is not None,
+            humidity=data["main"]["humidity"],
+            feels_like=data["main"].get("feels_like")
+        )
 
 class GoogleCalendarClient:
     """Client for Google Calendar API"""
     
+    # Socket timeouts in seconds; a worker thread can't be cancelled, so the deadline lives on the transport
+    CALL_TIMEOUT = 5
+    BATCH_TIMEOUT = 30
+    BATCH_LIMIT = 50
+    BATCH_MAX_ATTEMPTS = 4
+    
     def __init__(self):
         self.scopes = ['https://www.googleapis.com/auth/calendar']
         self.service = None
+        self.creds = None
         self.credentials_file = 'credentials.json'
         self.token_file = 'token.json'
+        self._auth_lock = asyncio.Lock()
+    
+    async def ensure_authenticated(self):
+        """Authenticate on first use and return the cached service"""
+        async with self._auth_lock:
+            if not self.service:
+                # OAuth and discovery are blocking, keep them off the event loop
+                await asyncio.to_thread(self.authenticate)
+        return self.service
     
     def authenticate(self):
         """Authenticate with Google Calendar API using OAuth 2.0"""
@@ -270,7 +562,8 @@ class GoogleCalendarClient:
         
         # Check if token.json exists (stored credentials)
         if os.path.exists(self.token_file):
-            creds = Credentials.from_authorized_user_file(self.token_file, self.scopes)
+            with open(self.token_file, 'rb') as fh:
+                creds = Credentials.from_authorized_user_info(orjson.loads(fh.read()), self.scopes)
         
         # If there are no (valid) credentials available, let the user log in
         if not creds or not creds.valid:
@@ -279,12 +572,12 @@ class GoogleCalendarClient:
                     creds.refresh(Request())
                     logger.info("Refreshed Google Calendar credentials")
                 except Exception as e:
-                    logger.error(f"Error refreshing credentials: {e}")
+                    logger.error("Error refreshing credentials: %s", e)
                     creds = None
             
             if not creds:
                 if not os.path.exists(self.credentials_file):
-                    logger.error(f"Credentials file '{self.credentials_file}' not found. Please download it from Google Cloud Console.")
+                    logger.error("Credentials file '%s' not found. Please download it from Google Cloud Console.", self.credentials_file)
                     return False
                 
                 try:
@@ -293,7 +586,7 @@ class GoogleCalendarClient:
                     creds = flow.run_local_server(port=0)
                     logger.info("Successfully authenticated with Google Calendar")
                 except Exception as e:
-                    logger.error(f"Error during OAuth flow: {e}")
+                    logger.error("Error during OAuth flow: %s", e)
                     return False
             
             # Save the credentials for the next run
@@ -302,16 +595,56 @@ class GoogleCalendarClient:
                     token.write(creds.to_json())
                 logger.info("Saved Google Calendar credentials to token.json")
             except Exception as e:
-                logger.error(f"Error saving credentials: {e}")
+                logger.error("Error saving credentials: %s", e)
         
         try:
-            self.service = build('calendar', 'v3', credentials=creds)
+            # Use the discovery document bundled with googleapiclient instead of fetching it
+            self.service = build('calendar', 'v3', credentials=creds, model=OrjsonModel(),
+                                 cache_discovery=False, static_discovery=True)
+            self.creds = creds
             logger.info("Google Calendar service initialized successfully")
             return True
         except Exception as e:
-            logger.error(f"Error building Google Calendar service: {e}")
+            logger.error("Error building Google Calendar service: %s", e)
             return False
     
+    def _http(self, timeout: float) -> AuthorizedHttp:
+        """Return a fresh authorized transport for one call"""
+        # httplib2 connections are not thread-safe, so worker threads never share one
+        return AuthorizedHttp(self.creds, http=httplib2.Http(timeout=timeout))
+    
+    def _to_event(self, intent: IntentExtraction) -> Dict[str, Any]:
+        """Build the Google Calendar event body for an intent"""
+        start_time = intent.parsed_dt
+        if start_time is None:
+            raise ValueError(f"Invalid event datetime: {intent.datetime_str}")
+        
+        # Default duration: 1 hour
+        end_time = start_time + timedelta(hours=1)
+        
+        return {
+            # Client-generated id, so a retried insert that already landed gets 409 instead of a duplicate
+            'id': uuid.uuid4().hex,
+            'summary': intent.activity,
+            'location': intent.location or 'Singapore',
+            'description': f'Scheduled via AI Calendar Bot\nActivity: {intent.activity}',
+            'start': {
+                'dateTime': start_time.isoformat(),
+                'timeZone': 'Asia/Singapore',  # Adjust timezone as needed
+            },
+            'end': {
+                'dateTime': end_time.isoformat(),
+                'timeZone': 'Asia/Singapore',  # Adjust timezone as needed
+            },
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'email', 'minutes': 24 * 60},  # 1 day before
+                    {'method': 'popup', 'minutes': 30},       # 30 minutes before
+                ],
+            },
+        }
+    
     async def create_event(self, intent: IntentExtraction) -> bool:
         """Create calendar event"""
         if not self.service:
@@ -319,96 +652,154 @@ class GoogleCalendarClient:
             return False
         
         try:
-            # Parse the datetime
-            from datetime import datetime, timedelta
-            start_time = datetime.fromisoformat(intent.datetime_str.replace('Z', '+00:00'))
-            
-            # Default duration: 1 hour
-            end_time = start_time + timedelta(hours=1)
+            event = self._to_event(intent)
             
-            # Create event object
-            event = {
-                'summary': intent.activity,
-                'location': intent.location or 'Singapore',
-                'description': f'Scheduled via AI Calendar Bot\nActivity: {intent.activity}',
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': 'Asia/Singapore',  # Adjust timezone as needed
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': 'Asia/Singapore',  # Adjust timezone as needed
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                        {'method': 'popup', 'minutes': 30},       # 30 minutes before
-                    ],
-                },
-            }
-            
-            # Insert the event
-            event_result = self.service.events().insert(calendarId='primary', body=event).execute()
-            logger.info(f"Calendar event created: {event_result.get('htmlLink')}")
+            # Insert the event (googleapiclient is blocking, so run it in a worker thread)
+            async for attempt in upstream_retrying():
+                with attempt:
+                    try:
+                        event_result = await asyncio.to_thread(
+                            self.service.events().insert(calendarId='primary', body=event, fields='htmlLink').execute,
+                            http=self._http(self.CALL_TIMEOUT)
+                        )
+                        logger.info("Calendar event created: %s", event_result.get('htmlLink'))
+                    except HttpError as e:
+                        if e.resp.status != 409:
+                            raise
+                        # An earlier attempt created the event before its response was lost
+                        logger.info("Calendar event %s already created", event['id'])
             return True
             
         except Exception as e:
-            logger.error(f"Error creating calendar event: {e}")
+            logger.error("Error creating calendar event: %s", e)
             return False
+    
+    async def create_events_batch(self, intents: list[IntentExtraction]) -> list[bool]:
+        """Create several calendar events with batched requests, returning success per intent"""
+        results = [False] * len(intents)
+        if not self.service:
+            logger.error("Google Calendar service not initialized")
+            return results
+        
+        # Build each body once, so a retried insert keeps its event id and a duplicate gets 409
+        events = {}
+        for index, intent in enumerate(intents):
+            try:
+                events[index] = self._to_event(intent)
+            except ValueError as e:
+                logger.error("Error building calendar event %s: %s", index, e)
+        indexes = list(events)
+        
+        # Google caps a batch at 50 requests
+        for offset in range(0, len(indexes), self.BATCH_LIMIT):
+            pending = {index: events[index] for index in indexes[offset:offset + self.BATCH_LIMIT]}
+            
+            for attempt in range(self.BATCH_MAX_ATTEMPTS):
+                try:
+                    retry = await asyncio.to_thread(self._execute_batch, pending, results)
+                except HttpError as e:
+                    if e.resp.status not in RETRYABLE_STATUS:
+                        logger.error("Error executing calendar batch: %s", e)
+                        break
+                    retry = [index for index in pending if not results[index]]
+                except Exception as e:
+                    logger.error("Error executing calendar batch: %s", e)
+                    break
+                
+                if not retry or attempt == self.BATCH_MAX_ATTEMPTS - 1:
+                    break
+                
+                # Exponential backoff with jitter before retrying rate-limited inserts
+                pending = {index: pending[index] for index in retry}
+                await asyncio.sleep(2 ** attempt + random.random())
+        
+        return results
+    
+    def _execute_batch(self, pending: Dict[int, Dict[str, Any]], results: list[bool]) -> list[int]:
+        """Execute one batch of inserts, returning the indexes worth retrying"""
+        retry = []
+        
+        def on_insert(request_id, response, exception):
+            index = int(request_id)
+            # 409 means an earlier attempt already created this event id
+            if exception is None or (isinstance(exception, HttpError) and exception.resp.status == 409):
+                results[index] = True
+            elif isinstance(exception, HttpError) and exception.resp.status in RETRYABLE_STATUS:
+                retry.append(index)
+            else:
+                logger.error("Error creating calendar event %s: %s", index, exception)
+        
+        batch = self.service.new_batch_http_request(callback=on_insert)
+        for index, event in pending.items():
+            # Only success matters for batched inserts, so ask for the smallest response
+            batch.add(self.service.events().insert(calendarId='primary', body=event, fields='id'),
+                      request_id=str(index))
+        
+        batch.execute(http=self._http(self.BATCH_TIMEOUT))
+        return retry
+
+# Shared clients so caches and the authenticated calendar service outlive a single node
+WEATHER_CLIENT = WeatherClient(os.getenv("OPENWEATHER_API_KEY"))
+CALENDAR_CLIENT = GoogleCalendarClient()
+
+# Prefetch the default location's forecast while Gemini extracts the intent
+SPECULATIVE_WEATHER = os.getenv("SPECULATIVE_WEATHER", "true").lower() == "true"
 
 # =============================================================================
 # LANGGRAPH AGENT NODES
 # =============================================================================
 
-async def extract_intent_node(state: AgentState) -> AgentState:
+async def extract_intent_node(state: AgentState, gemini_client: GeminiClient) -> AgentState:
     """Node to extract intent from user message"""
+    if state.skip_intent_extraction and state.intent:
+        logger.info("Using intent extracted before the workflow")
+        return state
+    
     logger.info("Extracting intent from user message")
     
-    gemini_client = GeminiClient(os.getenv("GEMINI_API_KEY"))
-    intent = await gemini_client.extract_intent(state["user_message"])
+    intent = await gemini_client.extract_intent(state.user_message)
     
-    state["intent"] = intent
-    logger.info(f"Extracted intent: {intent}")
+    state.intent = intent
+    logger.info("Extracted intent: %s", intent)
     return state
 
-async def check_weather_node(state: AgentState) -> AgentState:
-    """Node to check weather for the planned activity"""
-    logger.info("Checking weather forecast")
+async def weather_and_prep_node(state: AgentState, weather_client: WeatherClient,
+                                calendar_client: GoogleCalendarClient) -> AgentState:
+    """Node to check weather for the planned activity while preparing the calendar service"""
+    logger.info("Checking weather forecast and preparing calendar")
     
-    if not state["intent"]:
-        state["weather"] = None
+    if not state.intent:
+        state.weather = None
         return state
     
-    weather_client = WeatherClient(os.getenv("OPENWEATHER_API_KEY"))
-    location = state["intent"].location or "Singapore"  # Default location
+    location = state.intent.location or "Singapore"  # Default location
     
-    weather = await weather_client.get_weather_forecast(
-        state["intent"].datetime_str, 
-        location
+    # Weather and calendar authentication are independent once the intent is known
+    weather, _ = await asyncio.gather(
+        weather_client.get_weather_forecast(state.intent.parsed_dt, location),
+        calendar_client.ensure_authenticated()
     )
     
-    state["weather"] = weather
-    logger.info(f"Weather check: {weather}")
+    state.weather = weather
+    logger.info("Weather check: %s", weather)
     return state
 
-async def weather_query_node(state: AgentState) -> AgentState:
+async def weather_query_node(state: AgentState, weather_client: WeatherClient) -> AgentState:
     """Node to handle weather-only queries"""
     logger.info("Handling weather query")
     
-    if not state["intent"]:
-        state["response_message"] = "I couldn't understand your weather query. Please try again."
+    if not state.intent:
+        state.response_message = "I couldn't understand your weather query. Please try again."
         return state
     
-    weather_client = WeatherClient(os.getenv("OPENWEATHER_API_KEY"))
-    location = state["intent"].location or "Singapore"  # Default location
+    location = state.intent.location or "Singapore"  # Default location
     
     weather = await weather_client.get_weather_forecast(
-        state["intent"].datetime_str, 
+        state.intent.parsed_dt, 
         location
     )
     
-    state["weather"] = weather
+    state.weather = weather
     
     # Create comprehensive weather response
     response = f"🌤️ **Weather for {location.title()}**\n\n"
@@ -428,55 +819,57 @@ async def weather_query_node(state: AgentState) -> AgentState:
     else:
         response += f"\n✨ **Advice**: Great weather for outdoor activities!"
     
-    state["response_message"] = response
-    logger.info(f"Weather query response generated for {location}")
+    state.response_message = response
+    logger.info("Weather query response generated for %s", location)
     return state
 
-async def create_calendar_event_node(state: AgentState) -> AgentState:
-    """Node to create calendar event"""
-    logger.info("Creating calendar event")
-    
-    calendar_client = GoogleCalendarClient()
-    calendar_client.authenticate()
-    
-    success = await calendar_client.create_event(state["intent"])
-    state["calendar_event_created"] = success
+async def _create_event(state: AgentState, calendar_client: GoogleCalendarClient, suffix: str) -> AgentState:
+    """Create the calendar event for the intent and set the matching response"""
+    success = await calendar_client.create_event(state.intent)
+    state.calendar_event_created = success
     
     if success:
-        formatted_time = format_datetime_human_readable(state["intent"].datetime_str)
-        state["response_message"] = f"✅ Great! I've scheduled '{state['intent'].activity}' for {formatted_time}. The weather looks good!"
+        formatted_time = format_datetime_human_readable(state.intent.parsed_dt)
+        state.response_message = f"✅ Great! I've scheduled '{state.intent.activity}' for {formatted_time}.{suffix}"
     else:
-        state["response_message"] = "❌ Sorry, I couldn't create the calendar event. Please try again."
+        state.response_message = "❌ Sorry, I couldn't create the calendar event. Please try again."
     
     return state
 
+async def create_calendar_event_node(state: AgentState, calendar_client: GoogleCalendarClient) -> AgentState:
+    """Node to create calendar event"""
+    logger.info("Creating calendar event")
+    return await _create_event(state, calendar_client, " The weather looks good!")
+
+async def create_event_no_weather_node(state: AgentState, calendar_client: GoogleCalendarClient) -> AgentState:
+    """Node to create calendar event for indoor activities without checking the weather"""
+    logger.info("Creating calendar event for indoor activity")
+    await calendar_client.ensure_authenticated()
+    return await _create_event(state, calendar_client, "")
+
 async def request_time_clarification_node(state: AgentState) -> AgentState:
     """Node to request time clarification when user doesn't provide specific time"""
     logger.info("Requesting time clarification")
     
-    activity = state["intent"].activity
-    date_part = format_datetime_human_readable(state["intent"].datetime_str)
+    activity = state.intent.activity
+    # Fall back to the raw string if the LLM returned an unparseable date
+    date_part = format_datetime_human_readable(state.intent.parsed_dt or state.intent.datetime_str)
     
-    state["response_message"] = f"⏰ I see you want to {activity} on {date_part}, but what time would you prefer?\n\nFor example:\n• '3pm'\n• '2:30 in the afternoon'\n• '9 in the morning'\n• 'around lunchtime'"
-    state["needs_clarification"] = True
+    state.response_message = CLARIFY_TIME_TPL.format(activity=activity, date=date_part)
+    state.needs_clarification = True
     return state
 
 async def casual_conversation_node(state: AgentState) -> AgentState:
     """Node to handle casual conversation and greetings"""
     logger.info("Handling casual conversation")
     
-    user_message_lower = state["user_message"].lower()
+    user_message_lower = state.user_message.lower()
     
-    # Generate appropriate responses for different types of casual messages
-    if any(greeting in user_message_lower for greeting in ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]):
-        state["response_message"] = "Hello! 👋 I'm your AI scheduling assistant. I can help you:\n\n📅 **Schedule activities** - Just tell me what you want to do and when!\n🌤️ **Check weather** - Ask about weather for any location\n\n**Examples:**\n• 'I want to go for a run tomorrow at 3pm'\n• 'Schedule a meeting this Friday at 2pm'\n• 'What's the weather like tomorrow?'\n\nHow can I help you today?"
-    elif any(question in user_message_lower for question in ["how are you", "what's up", "how's it going"]):
-        state["response_message"] = "I'm doing great, thank you! 😊 I'm here and ready to help you schedule activities and check the weather. What would you like to plan today?"
-    elif any(thanks in user_message_lower for thanks in ["thank", "thanks", "appreciate"]):
-        state["response_message"] = "You're very welcome! 😊 Feel free to ask me anytime if you need help scheduling activities or checking the weather!"
-    else:
-        # Generic casual conversation response
-        state["response_message"] = "I'm your AI scheduling assistant! 🤖 I can help you schedule activities and check weather forecasts.\n\n**Try asking me:**\n• 'Schedule a workout tomorrow at 6pm'\n• 'What's the weather like this weekend?'\n• 'I want to have a picnic on Saturday'\n\nWhat would you like to plan?"
+    # Pick the response for the first matching kind of casual message
+    state.response_message = next(
+        (response for pattern, response in _CASUAL_RESPONSES if pattern.search(user_message_lower)),
+        CASUAL_DEFAULT_RESPONSE
+    )
     
     return state
 
@@ -484,16 +877,18 @@ async def request_clarification_node(state: AgentState) -> AgentState:
     """Node to request clarification when weather is rainy or intent is unclear"""
     
     # Check if this is due to unclear intent or rainy weather
-    if not state["intent"] or state["intent"].confidence <= 0.5 or state["intent"].activity == "unknown":
+    if not state.intent or state.intent.confidence <= 0.5 or state.intent.activity == "unknown":
         logger.info("Requesting clarification due to unclear intent")
-        state["response_message"] = "I'm not sure I understood what you'd like to do. Could you please be more specific?\n\n📅 **For scheduling:**\n• 'I want to go for a run at 4pm this Saturday'\n• 'Schedule a picnic tomorrow at 2pm'\n• 'Plan a bike ride next Tuesday morning'\n\n🌤️ **For weather queries:**\n• 'What's the weather like tomorrow?'\n• 'How's the weather this Saturday 3pm?'"
+        state.response_message = UNCLEAR_INTENT_RESPONSE
     else:
         logger.info("Requesting clarification due to rainy weather")
-        weather_desc = state["weather"].description if state["weather"] else "rainy"
-        formatted_time = format_datetime_human_readable(state["intent"].datetime_str)
-        state["response_message"] = f"🌧️ The weather forecast shows {weather_desc} for your planned {state['intent'].activity} on {formatted_time}. Would you like to:\n\n1. Proceed anyway\n2. Reschedule to a different time\n3. Cancel the activity\n\nPlease let me know what you'd prefer!"
+        weather_desc = state.weather.description if state.weather else "rainy"
+        formatted_time = format_datetime_human_readable(state.intent.parsed_dt)
+        state.response_message = RAINY_WEATHER_TPL.format(
+            weather=weather_desc, activity=state.intent.activity, date=formatted_time
+        )
     
-    state["needs_clarification"] = True
+    state.needs_clarification = True
     return state
 
 # =============================================================================
@@ -502,26 +897,30 @@ async def request_clarification_node(state: AgentState) -> AgentState:
 
 def should_check_weather(state: AgentState) -> str:
     """Router: decide if we should check weather, handle weather query, casual conversation, or request clarification"""
-    if state["intent"]:
+    if state.intent:
         # Handle casual conversation (greetings, general chat)
-        if state["intent"].activity == "casual conversation" and state["intent"].confidence <= 0.1:
+        if state.intent.activity == "casual conversation" and state.intent.confidence <= 0.1:
             return "casual_conversation"
         
         # Handle clear intents with good confidence
-        if state["intent"].confidence > 0.5 and state["intent"].activity not in ["unknown", "casual conversation"]:
-            if state["intent"].is_weather_query:
+        if state.intent.confidence > 0.5 and state.intent.activity not in ["unknown", "casual conversation"]:
+            if state.intent.is_weather_query:
                 return "weather_query"
-            elif not state["intent"].has_specific_time:
+            elif not state.intent.has_specific_time:
                 return "request_time_clarification"
-            else:
-                return "check_weather"
+            
+            # Indoor activities don't depend on the weather, so skip the forecast lookup
+            tokens = set(state.intent.activity.lower().split())
+            if tokens & _INDOOR and not tokens & _OUTDOOR:
+                return "create_event_no_weather"
+            return "weather_and_prep"
     
     # Default to clarification for unclear intents
     return "request_clarification"
 
 def should_create_event(state: AgentState) -> str:
     """Router: decide if we should create calendar event or ask for clarification"""
-    if state["weather"] and not state["weather"].is_rainy:
+    if state.weather and not state.weather.is_rainy:
         return "create_event"
     else:
         return "request_clarification"
@@ -530,16 +929,23 @@ def should_create_event(state: AgentState) -> str:
 # LANGGRAPH WORKFLOW
 # =============================================================================
 
-def create_agent_workflow() -> StateGraph:
-    """Create the LangGraph workflow"""
+def create_agent_workflow(gemini_client: Optional[GeminiClient] = None,
+                          weather_client: Optional[WeatherClient] = None,
+                          calendar_client: Optional[GoogleCalendarClient] = None) -> StateGraph:
+    """Create the LangGraph workflow, binding the API clients its nodes share"""
+    gemini_client = gemini_client or GeminiClient(os.getenv("GEMINI_API_KEY"))
+    weather_client = weather_client or WEATHER_CLIENT
+    calendar_client = calendar_client or CALENDAR_CLIENT
     
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("extract_intent", extract_intent_node)
-    workflow.add_node("check_weather", check_weather_node)
-    workflow.add_node("weather_query", weather_query_node)
-    workflow.add_node("create_event", create_calendar_event_node)
+    workflow.add_node("extract_intent", partial(extract_intent_node, gemini_client=gemini_client))
+    workflow.add_node("weather_and_prep", partial(weather_and_prep_node, weather_client=weather_client,
+                                                  calendar_client=calendar_client))
+    workflow.add_node("weather_query", partial(weather_query_node, weather_client=weather_client))
+    workflow.add_node("create_event", partial(create_calendar_event_node, calendar_client=calendar_client))
+    workflow.add_node("create_event_no_weather", partial(create_event_no_weather_node, calendar_client=calendar_client))
     workflow.add_node("request_time_clarification", request_time_clarification_node)
     workflow.add_node("request_clarification", request_clarification_node)
     workflow.add_node("casual_conversation", casual_conversation_node)
@@ -551,7 +957,8 @@ def create_agent_workflow() -> StateGraph:
         "extract_intent",
         should_check_weather,
         {
-            "check_weather": "check_weather",
+            "weather_and_prep": "weather_and_prep",
+            "create_event_no_weather": "create_event_no_weather",
             "weather_query": "weather_query",
             "request_time_clarification": "request_time_clarification",
             "request_clarification": "request_clarification",
@@ -560,7 +967,7 @@ def create_agent_workflow() -> StateGraph:
     )
     
     workflow.add_conditional_edges(
-        "check_weather",
+        "weather_and_prep",
         should_create_event,
         {
             "create_event": "create_event",
@@ -569,6 +976,7 @@ def create_agent_workflow() -> StateGraph:
     )
     
     workflow.add_edge("create_event", END)
+    workflow.add_edge("create_event_no_weather", END)
     workflow.add_edge("weather_query", END)
     workflow.add_edge("request_time_clarification", END)
     workflow.add_edge("request_clarification", END)
@@ -583,13 +991,41 @@ def create_agent_workflow() -> StateGraph:
 class TelegramBot:
     """Telegram bot handler"""
     
+    RESPONSE_CACHE_SIZE = 512
+    RESPONSE_CACHE_TTL = 120  # seconds
+    CONTEXT_TTL = 600  # 10 minutes
+    
     def __init__(self, token: str):
         self.token = token
-        self.app = Application.builder().token(token).build()
-        self.agent_workflow = create_agent_workflow()
+        self.app = (
+            Application.builder()
+            .token(token)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
+        
+        # API clients shared by the workflow and the clarification handlers
+        gemini_api_key = os.getenv("GEMINI_API_KEY")
+        if not gemini_api_key:
+            raise ValueError("GEMINI_API_KEY is not set")
+        self.gemini_client = GeminiClient(gemini_api_key)
+        self.weather_client = WEATHER_CLIENT
+        self.calendar_client = CALENDAR_CLIENT
+        self.agent_workflow = create_agent_workflow(self.gemini_client, self.weather_client, self.calendar_client)
         
         # Store conversation context for multi-turn conversations
-        self.conversation_context = {}
+        # Entries expire on their own after 10 minutes; the size bound caps memory
+        self.conversation_context = TTLCache(maxsize=10_000, ttl=self.CONTEXT_TTL)
+        
+        # Recent replies to side-effect-free messages, keyed by normalized text
+        self.response_cache = TTLCache(maxsize=self.RESPONSE_CACHE_SIZE, ttl=self.RESPONSE_CACHE_TTL)
+        
+        # Messages are processed in the background, one at a time per chat; a chat's lock
+        # lives only while it has messages queued or running
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._chat_pending: dict[int, int] = {}
+        self._tasks: set[asyncio.Task] = set()
         
         # Add handlers
         self.app.add_handler(CommandHandler("start", self.start_command))
@@ -624,90 +1060,117 @@ I default to Singapore for weather unless you specify another location! 🇸🇬
         user_message = update.message.text.strip()
         chat_id = update.effective_chat.id
         
-        logger.info(f"Received message from {chat_id}: {user_message}")
+        logger.info("Received message from %s: %s", chat_id, user_message)
         
         # Skip empty or very short messages
         if not user_message or len(user_message) < 2:
             logger.info("Skipping empty or very short message")
             return
         
-        # Clean up old conversation contexts (older than 10 minutes)
-        self.cleanup_old_contexts()
+        # Most requests target the default location, so start its forecast fetch now;
+        # the weather node picks it up instead of waiting for its own round-trip
+        if SPECULATIVE_WEATHER:
+            self.weather_client.prefetch_forecast("Singapore")
+        
+        # Run the slow LLM/weather work off the update handler so other chats aren't held up
+        if chat_id not in self._chat_locks:
+            self._chat_locks[chat_id] = asyncio.Lock()
+        self._chat_pending[chat_id] = self._chat_pending.get(chat_id, 0) + 1
+        task = asyncio.create_task(self._serialized_run(update, user_message, chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _serialized_run(self, update: Update, user_message: str, chat_id: int):
+        """Process a message once the earlier messages from the same chat are done"""
+        try:
+            async with self._chat_locks[chat_id]:
+                await self._run_workflow(update, user_message, chat_id)
+        except Exception as e:
+            logger.error("Error handling message from %s: %s", chat_id, e)
+        finally:
+            # Forget the chat's lock once nothing else is queued behind it
+            self._chat_pending[chat_id] -= 1
+            if not self._chat_pending[chat_id]:
+                del self._chat_pending[chat_id]
+                del self._chat_locks[chat_id]
+    
+    async def _run_workflow(self, update: Update, user_message: str, chat_id: int):
+        """Answer a message, either as a clarification reply or as a new request"""
+        lowered = user_message.lower()
         
         # Check if this is a response to a clarification request
         # Only treat as clarification if it's a short response or contains clarification keywords
         if chat_id in self.conversation_context:
             # Check if this looks like a new scheduling request instead of a clarification
-            scheduling_keywords = ["want", "schedule", "plan", "book", "at", "tomorrow", "today", "this", "next"]
-            if any(keyword in user_message.lower() for keyword in scheduling_keywords) and len(user_message.split()) > 3:
+            tokens = lowered.split()
+            if _SCHED_KW.intersection(tokens) and len(tokens) > 3:
                 # This looks like a new request, clear old context and process as new
                 logger.info("Detected new scheduling request, clearing old context")
-                del self.conversation_context[chat_id]
+                self.conversation_context.pop(chat_id, None)
             else:
                 await self.handle_clarification_response(update, user_message, chat_id)
                 return
         
+        # Repeated weather questions get the reply we just computed
+        cache_key = lowered  # already stripped in handle_message
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is not None:
+            logger.info("Serving cached response for %s", chat_id)
+            await update.message.reply_text(cached_response)
+            return
+        
         # Create initial state for new conversation
-        initial_state = AgentState(
-            user_message=user_message,
-            telegram_chat_id=chat_id,
-            intent=None,
-            weather=None,
-            calendar_event_created=False,
-            response_message="",
-            needs_clarification=False
-        )
+        # The remaining fields start from the AgentState defaults
+        initial_state = AgentState(user_message=user_message, telegram_chat_id=chat_id)
         
         try:
             # Run the agent workflow
-            final_state = await self.agent_workflow.ainvoke(initial_state)
+            final_state = await self._run_agent(initial_state)
             
             # Store context for different types of clarification
-            if final_state["needs_clarification"] and final_state["intent"]:
-                if final_state["intent"].confidence > 0.5 and not final_state["intent"].has_specific_time:
+            if final_state.needs_clarification and final_state.intent:
+                if final_state.intent.confidence > 0.5 and not final_state.intent.has_specific_time:
                     # Time clarification needed
                     self.conversation_context[chat_id] = {
-                        "original_intent": final_state["intent"],
-                        "waiting_for": "time_clarification",
-                        "timestamp": time.time()
+                        "original_intent": final_state.intent,
+                        "waiting_for": "time_clarification"
                     }
-                elif (final_state["intent"].confidence > 0.5 and 
-                      final_state["weather"] and 
-                      final_state["weather"].is_rainy):
+                elif (final_state.intent.confidence > 0.5 and 
+                      final_state.weather and 
+                      final_state.weather.is_rainy):
                     # Weather clarification needed
                     self.conversation_context[chat_id] = {
-                        "original_intent": final_state["intent"],
-                        "weather": final_state["weather"],
-                        "waiting_for": "weather_clarification",
-                        "timestamp": time.time()
+                        "original_intent": final_state.intent,
+                        "weather": final_state.weather,
+                        "waiting_for": "weather_clarification"
                     }
             
+            # Only weather answers are safe to replay; anything that touched the calendar or
+            # expects a follow-up has to go through the workflow again, and a reply built
+            # from placeholder weather must not outlive the outage
+            if (final_state.intent and final_state.intent.is_weather_query
+                    and final_state.weather and not final_state.weather.is_fallback
+                    and not final_state.calendar_event_created and not final_state.needs_clarification):
+                self.response_cache[cache_key] = final_state.response_message
+            
             # Send response back to user
-            await update.message.reply_text(final_state["response_message"])
+            await update.message.reply_text(final_state.response_message)
             
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            await update.message.reply_text("Sorry, I encountered an error. Please try again.")
+            logger.error("Error processing message: %s", e)
+            # Fallback replies go out silently and without quoting the user's message
+            await update.effective_chat.send_message("Sorry, I encountered an error. Please try again.", disable_notification=True)
     
-    def cleanup_old_contexts(self):
-        """Remove conversation contexts older than 10 minutes"""
-        current_time = time.time()
-        expired_chats = []
-        
-        for chat_id, context in self.conversation_context.items():
-            if current_time - context.get("timestamp", 0) > 600:  # 10 minutes
-                expired_chats.append(chat_id)
-        
-        for chat_id in expired_chats:
-            logger.info(f"Cleaning up expired context for chat {chat_id}")
-            del self.conversation_context[chat_id]
+    async def _run_agent(self, initial_state: AgentState) -> AgentState:
+        """Run the workflow and return its final state"""
+        # LangGraph returns the final state values as a plain dict
+        return AgentState(**await self.agent_workflow.ainvoke(initial_state))
     
     async def handle_clarification_response(self, update: Update, user_message: str, chat_id: int):
         """Handle responses to clarification questions"""
         context = self.conversation_context[chat_id]
-        user_message_lower = user_message.lower()
         
-        logger.info(f"Handling clarification response: {user_message}")
+        logger.info("Handling clarification response: %s", user_message)
         
         if context["waiting_for"] == "time_clarification":
             # Handle time clarification response
@@ -718,39 +1181,28 @@ I default to Singapore for weather unless you specify another location! 🇸🇬
     
     async def handle_time_clarification_response(self, update: Update, user_message: str, chat_id: int, context: dict):
         """Handle time clarification responses"""
-        from datetime import datetime
-        
-        # Extract time from user's response using Gemini
-        gemini_client = GeminiClient(os.getenv("GEMINI_API_KEY"))
-        
         # Get the original date from the context
         original_intent = context["original_intent"]
-        original_date = datetime.fromisoformat(original_intent.datetime_str.replace('Z', '+00:00'))
+        # Parsed when the intent was validated; an unparseable date falls back to today
+        original_date = original_intent.parsed_dt or datetime.now()
         
         # Create a combined message that preserves the original date context
         # Extract the relative date reference from the original datetime
         today = datetime.now().date()
         original_date_only = original_date.date()
-        
-        if original_date_only == today:
-            date_reference = "today"
-        elif (original_date_only - today).days == 1:
-            date_reference = "tomorrow"
-        elif (original_date_only - today).days == -1:
-            date_reference = "yesterday"
-        else:
-            # Use the formatted date
-            date_reference = original_date.strftime("%A")  # Day of week, or could use full date
+        delta = (original_date_only - today).days
+        # Nearby days get a relative word; anything else uses the day of the week
+        date_reference = _RELATIVE_DAYS.get(delta) or original_date.strftime("%A")
         
         combined_message = f"I want to {original_intent.activity} {date_reference} at {user_message}"
         
         try:
             # Re-extract intent with the time information
-            updated_intent = await gemini_client.extract_intent(combined_message)
+            updated_intent = await self.gemini_client.extract_intent(combined_message)
             
             if updated_intent.has_specific_time and updated_intent.confidence > 0.7:
                 # Verify the date is preserved correctly by manually setting it if needed
-                updated_datetime = datetime.fromisoformat(updated_intent.datetime_str.replace('Z', '+00:00'))
+                updated_datetime = updated_intent.parsed_dt
                 
                 # If the date got reset to today when we meant a different day, fix it
                 if updated_datetime.date() != original_date_only:
@@ -768,77 +1220,97 @@ I default to Singapore for weather unless you specify another location! 🇸🇬
                     user_message=combined_message,
                     telegram_chat_id=chat_id,
                     intent=updated_intent,
-                    weather=None,
-                    calendar_event_created=False,
-                    response_message="",
-                    needs_clarification=False
+                    skip_intent_extraction=True
                 )
                 
                 # Continue with weather check and scheduling
-                final_state = await self.agent_workflow.ainvoke(initial_state)
+                final_state = await self._run_agent(initial_state)
                 
                 # Handle any further clarification needed (e.g., weather)
-                if final_state["needs_clarification"] and final_state["weather"] and final_state["weather"].is_rainy:
+                if final_state.needs_clarification and final_state.weather and final_state.weather.is_rainy:
                     self.conversation_context[chat_id] = {
-                        "original_intent": final_state["intent"],
-                        "weather": final_state["weather"],
-                        "waiting_for": "weather_clarification",
-                        "timestamp": time.time()
+                        "original_intent": final_state.intent,
+                        "weather": final_state.weather,
+                        "waiting_for": "weather_clarification"
                     }
                 else:
                     # Clear context if no further clarification needed
-                    del self.conversation_context[chat_id]
+                    self.conversation_context.pop(chat_id, None)
                 
-                await update.message.reply_text(final_state["response_message"])
+                await update.message.reply_text(final_state.response_message)
             else:
                 # Time extraction failed, ask again
                 response = "I couldn't understand the time. Could you please specify a time? For example:\n• '3pm'\n• '2:30 in the afternoon'\n• '9 in the morning'"
-                await update.message.reply_text(response)
+                await update.effective_chat.send_message(response, disable_notification=True)
                 # Keep context for another try
                 
         except Exception as e:
-            logger.error(f"Error processing time clarification: {e}")
+            logger.error("Error processing time clarification: %s", e)
             response = "Sorry, I had trouble understanding the time. Could you please try again?"
-            await update.message.reply_text(response)
+            await update.effective_chat.send_message(response, disable_notification=True)
     
     async def handle_weather_clarification_response(self, update: Update, user_message: str, chat_id: int, context: dict):
         """Handle weather clarification responses"""
-        user_message_lower = user_message.lower()
-        
         # Parse the user's response
-        if any(word in user_message_lower for word in ["1", "proceed", "yes", "continue", "anyway"]):
+        choice = parse_weather_choice(user_message)
+        
+        if choice == "proceed":
             # User wants to proceed anyway
-            calendar_client = GoogleCalendarClient()
-            calendar_client.authenticate()
-            success = await calendar_client.create_event(context["original_intent"])
+            await self.calendar_client.ensure_authenticated()
+            success = await self.calendar_client.create_event(context["original_intent"])
             
             if success:
-                formatted_time = format_datetime_human_readable(context["original_intent"].datetime_str)
+                formatted_time = format_datetime_human_readable(context["original_intent"].parsed_dt)
                 response = f"✅ Great! I've scheduled '{context['original_intent'].activity}' for {formatted_time} despite the weather. Stay safe!"
             else:
                 response = "❌ Sorry, I couldn't create the calendar event. Please try again."
                 
-        elif any(word in user_message_lower for word in ["2", "reschedule", "different", "later", "change"]):
+        elif choice == "reschedule":
             # User wants to reschedule
             response = "I'd be happy to help you reschedule! Please tell me when you'd prefer to do this activity instead."
             
-        elif any(word in user_message_lower for word in ["3", "cancel", "no", "don't", "skip"]):
+        elif choice == "cancel":
             # User wants to cancel
             response = f"No problem! I've cancelled your {context['original_intent'].activity} plan. Let me know if you'd like to schedule something else!"
             
         else:
             # Unclear response
             response = "I didn't quite understand. Please choose:\n\n1. Proceed anyway\n2. Reschedule to a different time\n3. Cancel the activity\n\nOr just type 'proceed', 'reschedule', or 'cancel'."
-            await update.message.reply_text(response)
+            await update.effective_chat.send_message(response, disable_notification=True)
             return  # Keep the context for another try
         
         # Clear the conversation context and send response
-        del self.conversation_context[chat_id]
+        self.conversation_context.pop(chat_id, None)
         await update.message.reply_text(response)
     
+    async def _post_init(self, application: Application):
+        """Prepare the event loop before polling starts"""
+        # Bounded pool for the blocking Google API calls offloaded with asyncio.to_thread
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=8))
+        
+        # Open the pooled HTTP session on the bot's loop and warm a connection to OpenWeather,
+        # so the first user message doesn't pay for DNS and the TLS handshake
+        get_http_session()
+        self.weather_client.prefetch_forecast("Singapore")
+        
+        # Authenticate the shared calendar client once instead of on the first event
+        await self.calendar_client.ensure_authenticated()
+    
+    async def _post_shutdown(self, application: Application):
+        """Release shared resources once polling has stopped"""
+        # Stop in-flight messages before closing the session they may still be using
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await close_http_session()
+    
     def run(self):
         """Start the bot"""
         logger.info("Starting Telegram bot...")
+        # Must be installed before run_polling creates the event loop
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("Using uvloop event loop")
         # Clear any pending updates to avoid processing old messages
         self.app.run_polling(drop_pending_updates=True)
 
@@ -858,7 +1330,7 @@ def main():
     
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
-        logger.error(f"Missing required environment variables: {missing_vars}")
+        logger.error("Missing required environment variables: %s", missing_vars)
         logger.error("Please set them in your .env file or environment")
         return
     
@@ -100,7 +100,7 @@ def print_next_steps():
     print("1. Edit .env file with your actual API keys")
     print("2. Get Telegram bot token from @BotFather")
     print("3. Get OpenWeatherMap API key from openweathermap.org")
-    print("4. Test the setup: python test_scripts/test_agent.py")
+    print("4. Test the setup: python -m test_scripts.test_agent")
     print("5. Run the agent: python main.py")
     print("\n📖 See README.md for detailed setup instructions")
 
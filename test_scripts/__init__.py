@@ -0,0 +1 @@
+"""Manual test scripts; run them from the project root, e.g. python -m test_scripts.test_agent"""
@@ -11,13 +11,10 @@ from datetime import datetime
 from dotenv import load_dotenv
 
 # Import our main components
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from main import (
-    GeminiClient, WeatherClient, GoogleCalendarClient,
+    GeminiClient, WeatherClient, CALENDAR_CLIENT,
     IntentExtraction, WeatherData, AgentState,
-    create_agent_workflow
+    create_agent_workflow, close_http_session
 )
 
 # Configure logging
@@ -57,7 +54,7 @@ async def test_weather_client():
     try:
         client = WeatherClient(api_key)
         weather = await client.get_weather_forecast(
-            datetime.now().isoformat(), 
+            datetime.now(), 
             "London"
         )
         print(f"✅ Weather data: {weather}")
@@ -72,8 +69,9 @@ async def test_calendar_client():
     print("\n📅 Testing Calendar Client...")
     
     try:
-        client = GoogleCalendarClient()
-        client.authenticate()
+        # The bot's shared client; the workflow test below reuses its authenticated service
+        client = CALENDAR_CLIENT
+        await client.ensure_authenticated()
         
         test_intent = IntentExtraction(
             activity="test run",
@@ -194,6 +192,7 @@ async def run_all_tests():
     else:
         print("⚠️ Some tests failed. Check configuration and API keys.")
     
+    await close_http_session()
     return passed_tests == total_tests
 
 def main():
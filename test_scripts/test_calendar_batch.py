@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test batched event creation against a scripted stand-in for the Calendar service
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from main import GoogleCalendarClient, IntentExtraction
+
+def _http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'')
+
+class _ScriptedService:
+    """Answers each batch execute with the next list of per-request statuses"""
+    
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+        self.sent_ids = []
+    
+    def events(self):
+        return self
+    
+    def insert(self, calendarId, body, fields):
+        return body
+    
+    def new_batch_http_request(self, callback):
+        service = self
+        
+        class Batch:
+            def __init__(self):
+                self.requests = []
+            
+            def add(self, body, request_id):
+                self.requests.append((request_id, body))
+            
+            def execute(self, http=None):
+                outcome = service.rounds.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                service.sent_ids.append([body['id'] for _, body in self.requests])
+                for (request_id, _), status in zip(self.requests, outcome):
+                    callback(request_id, {}, None if status == 200 else _http_error(status))
+        
+        return Batch()
+
+def _client(rounds):
+    client = GoogleCalendarClient()
+    client.service = _ScriptedService(rounds)
+    return client
+
+def _intents(count):
+    start = datetime.now() + timedelta(days=1)
+    return [
+        IntentExtraction(activity=f"Batch test {i}", datetime_str=(start + timedelta(hours=i)).isoformat(), confidence=0.9)
+        for i in range(count)
+    ]
+
+async def test_retry_keeps_event_ids():
+    """A retried insert reuses its event id, and 409 on the retry counts as created"""
+    client = _client([[200, 503], [409]])
+    
+    results = await client.create_events_batch(_intents(2))
+    
+    sent = client.service.sent_ids
+    assert results == [True, True], results
+    assert sent[1] == [sent[0][1]], "Retry must resend the same event id"
+    print("✅ Retried inserts keep their event ids and 409 counts as created")
+
+async def test_transport_errors_fail_cleanly():
+    """Errors other than HttpError are reported as failures instead of escaping"""
+    client = _client([TimeoutError("timed out")])
+    
+    results = await client.create_events_batch(_intents(2))
+    
+    assert results == [False, False], results
+    print("✅ Transport errors mark the batch as failed")
+
+async def main():
+    await test_retry_keeps_event_ids()
+    await test_transport_errors_fail_cleanly()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,9 +3,6 @@
 Quick test for human-readable date formatting
 """
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from main import format_datetime_human_readable
 
 def test_date_formatting():
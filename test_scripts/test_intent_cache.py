@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Test that the intent cache only reuses extractions for the same message
+"""
+
+from main import IntentCache, IntentExtraction
+
+def test_hours_do_not_collide():
+    """Messages differing only in hour must get their own cache entries"""
+    cache = IntentCache()
+    
+    key_3pm = cache.key("Run tomorrow at 3pm")
+    key_5pm = cache.key("run tomorrow at 5pm")
+    assert key_3pm != key_5pm, "Different hours should give different keys"
+    
+    cache.add(key_3pm, IntentExtraction(
+        activity="run",
+        datetime_str="2025-05-29T15:00:00",
+        confidence=0.9,
+        has_specific_time=True
+    ))
+    
+    assert cache.lookup(key_5pm) is None, "5pm must not reuse the 3pm extraction"
+    assert cache.lookup(cache.key("run  TOMORROW at 3pm")).datetime_str == "2025-05-29T15:00:00"
+    
+    print("✅ Messages differing only in hour do not collide")
+
+def test_clock_relative_messages_skip_cache():
+    """Times measured from now resolve differently on every call"""
+    cache = IntentCache()
+    
+    for message in ("run in 2 hours", "lunch in half an hour", "call me now"):
+        assert cache.key(message) is None, f"'{message}' should not be cached"
+    
+    print("✅ Clock-relative messages are never cached")
+
+if __name__ == "__main__":
+    test_hours_do_not_collide()
+    test_clock_relative_messages_skip_cache()
@@ -5,26 +5,24 @@ This tests the GoogleCalendarClient class from main.py directly
 """
 
 import sys
-import os
+import asyncio
 from datetime import datetime, timedelta
 
-# Add the current directory to Python path to import from main.py
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
 # Import the classes we need from main.py
-from main import GoogleCalendarClient, IntentExtraction
+from main import CALENDAR_CLIENT, IntentExtraction
 
 async def test_main_calendar_integration():
     """Test the calendar integration from main.py"""
     print("🧪 Testing Calendar Integration from main.py")
     print("=" * 50)
     
-    # Create a GoogleCalendarClient instance (same as in main.py)
-    calendar_client = GoogleCalendarClient()
+    # The same shared GoogleCalendarClient instance the bot uses
+    calendar_client = CALENDAR_CLIENT
     
     # Test authentication
     print("🔐 Testing authentication...")
-    auth_success = calendar_client.authenticate()
+    # Runs the blocking OAuth/token work in a worker thread, as the bot does
+    auth_success = await calendar_client.ensure_authenticated()
     
     if not auth_success:
         print("❌ Authentication failed!")
@@ -37,7 +35,7 @@ async def test_main_calendar_integration():
     
     # Create an intent for tomorrow at 3 PM
     tomorrow = datetime.now() + timedelta(days=1)
-    test_time = tomorrow.replace(hour=15, minute=0, second=0, microsecond=0)
+    test_time = datetime(tomorrow.year, tomorrow.month, tomorrow.day, 15)
     
     test_intent = IntentExtraction(
         activity="Test Meeting from Main Script",
@@ -56,20 +54,24 @@ async def test_main_calendar_integration():
     # Test event creation
     print("\n🆕 Testing event creation...")
     
-    try:
-        # This is the same method call that main.py uses
-        success = await calendar_client.create_event(test_intent)
-        
-        if success:
-            print("✅ Event created successfully!")
-            print("   Check your Google Calendar for the new event")
-            return True
-        else:
-            print("❌ Event creation failed!")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Error during event creation: {e}")
+    intents = [test_intent]
+    
+    # This is the same method call that main.py uses; further intents are created concurrently
+    results = await asyncio.gather(
+        *(calendar_client.create_event(intent) for intent in intents),
+        return_exceptions=True
+    )
+    
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"❌ Error during event creation: {result}")
+    
+    if all(result is True for result in results):
+        print("✅ Event created successfully!")
+        print("   Check your Google Calendar for the new event")
+        return True
+    else:
+        print("❌ Event creation failed!")
         return False
 
 async def main():
@@ -95,7 +97,6 @@ async def main():
     return success
 
 if __name__ == "__main__":
-    import asyncio
     try:
         success = asyncio.run(main())
         sys.exit(0 if success else 1)
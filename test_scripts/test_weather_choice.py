@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Test how replies to the rainy-weather question are resolved
+"""
+
+from main import parse_weather_choice
+
+def test_negated_replies_cancel():
+    """Negated replies must not proceed with the event"""
+    test_cases = [
+        ("no, don't proceed", "cancel"),
+        ("I don't want to continue", "cancel"),
+        ("dont go ahead anyway", "cancel"),
+        ("yes, proceed", "proceed"),
+        ("1", "proceed"),
+        ("let's change it to later", "reschedule"),
+        ("I know", None),
+    ]
+    
+    for message, expected in test_cases:
+        choice = parse_weather_choice(message)
+        status = "✅" if choice == expected else "❌"
+        print(f"{status} '{message}' → {choice} (expected: {expected})")
+        assert choice == expected, f"'{message}' should resolve to {expected}"
+    
+    print("✅ Negated replies resolve to cancel")
+
+if __name__ == "__main__":
+    test_negated_replies_cancel()
@@ -5,56 +5,51 @@ Quick test for weather forecast functionality
 
 import os
 import asyncio
+import aiohttp
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 load_dotenv()
 
 # Import our weather client
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from main import WeatherClient
 
+def _print_weather(label, weather):
+    """Print one forecast result with a single write"""
+    lines = [
+        f"🧪 {label}",
+        f"Temperature: {weather.temperature}°C",
+        f"Conditions: {weather.description}",
+        f"Humidity: {weather.humidity}%",
+        f"Is rainy: {weather.is_rainy}",
+    ]
+    if weather.feels_like:
+        lines.append(f"Feels like: {weather.feels_like}°C")
+    print("\n".join(lines) + "\n")
+
 async def test_weather_forecast():
     """Test the weather forecast functionality"""
     
-    weather_client = WeatherClient(os.getenv("OPENWEATHER_API_KEY"))
-    
-    # Test 1: Current weather for Singapore
-    print("🧪 Test 1: Current weather for Singapore")
-    current_time = datetime.now().isoformat()
-    weather = await weather_client.get_weather_forecast(current_time, "Singapore")
-    print(f"Temperature: {weather.temperature}°C")
-    print(f"Conditions: {weather.description}")
-    print(f"Humidity: {weather.humidity}%")
-    print(f"Is rainy: {weather.is_rainy}")
-    if weather.feels_like:
-        print(f"Feels like: {weather.feels_like}°C")
-    print()
-    
-    # Test 2: Tomorrow's weather
-    print("🧪 Test 2: Tomorrow's weather for Singapore")
-    tomorrow = (datetime.now() + timedelta(days=1)).isoformat()
-    weather = await weather_client.get_weather_forecast(tomorrow, "Singapore")
-    print(f"Temperature: {weather.temperature}°C")
-    print(f"Conditions: {weather.description}")
-    print(f"Humidity: {weather.humidity}%")
-    print(f"Is rainy: {weather.is_rainy}")
-    if weather.feels_like:
-        print(f"Feels like: {weather.feels_like}°C")
-    print()
+    # One pooled session for all three lookups, so they share connections
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=30)) as session:
+        weather_client = WeatherClient(os.getenv("OPENWEATHER_API_KEY"), session=session)
+        
+        async def _probe(label, target_time):
+            return label, await weather_client.get_weather_forecast(target_time, "Singapore")
+        
+        # Read the clock once and derive every test time from it
+        current_time = datetime.now()
+        tomorrow = current_time + timedelta(days=1)
+        tomorrow_3pm = datetime(tomorrow.year, tomorrow.month, tomorrow.day, 15)
+        
+        # Fetch all three forecasts concurrently; gather keeps them in this order
+        results = await asyncio.gather(
+            _probe("Test 1: Current weather for Singapore", current_time),
+            _probe("Test 2: Tomorrow's weather for Singapore", tomorrow),
+            _probe("Test 3: Tomorrow 3PM for Singapore", tomorrow_3pm),
+        )
     
-    # Test 3: Specific time tomorrow
-    print("🧪 Test 3: Tomorrow 3PM for Singapore")
-    tomorrow_3pm = (datetime.now() + timedelta(days=1)).replace(hour=15, minute=0, second=0, microsecond=0).isoformat()
-    weather = await weather_client.get_weather_forecast(tomorrow_3pm, "Singapore")
-    print(f"Temperature: {weather.temperature}°C")
-    print(f"Conditions: {weather.description}")
-    print(f"Humidity: {weather.humidity}%")
-    print(f"Is rainy: {weather.is_rainy}")
-    if weather.feels_like:
-        print(f"Feels like: {weather.feels_like}°C")
-    print()
+    for label, weather in results:
+        _print_weather(label, weather)
     
     print("✅ Weather forecast tests completed!")
 